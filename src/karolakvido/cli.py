@@ -1,13 +1,14 @@
 from __future__ import annotations
 
 import logging
+from collections.abc import Callable
 from pathlib import Path
 
 import click
 
 from . import DEFAULT_CALENDAR_URL, DEFAULT_OUTPUT_FILE
 from .ical import write_ics
-from .scraper import Event, KarolAKvidoClient
+from .scraper import Event, KarolAKvidoClient, strip_diacritics
 
 _LOG = logging.getLogger(__name__)
 
@@ -21,13 +22,16 @@ def _filter_events(events: list[Event], region: str | None) -> list[Event]:
     if not region:
         return events
 
-    needle = region.casefold()
-    filtered: list[Event] = []
-    for event in events:
-        haystacks = [event.location, event.city or "", event.title]
-        if any(needle in text.casefold() for text in haystacks):
-            filtered.append(event)
-    return filtered
+    needle = _fold_text(region)
+    return [event for event in events if needle in _region_haystack(event)]
+
+
+def _region_haystack(event: Event) -> str:
+    return _fold_text("\x00".join((event.location, event.city or "", event.title)))
+
+
+def _fold_text(text: str) -> str:
+    return strip_diacritics(text.casefold())
 
 
 @click.command(help="Export vystoupení Karol a Kvído do iCalendar")
@@ -52,12 +56,19 @@ def _filter_events(events: list[Event], region: str | None) -> list[Event]:
     show_default=True,
     help="Úroveň logování průběhu programu",
 )
-def cli(url: str, output: str, region: str | None, log_level: str) -> None:
+@click.pass_obj
+def cli(
+    client_factory: Callable[[], KarolAKvidoClient] | None,
+    url: str,
+    output: str,
+    region: str | None,
+    log_level: str,
+) -> None:
     _configure_logging(log_level)
 
     _LOG.info("Start exportu kalendáře")
     _LOG.info("Načítám události z %s", url)
-    client = KarolAKvidoClient()
+    client = (client_factory or KarolAKvidoClient)()
 
     events = client.collect_events(url)
     _LOG.info("Načteno %d událostí", len(events))
@@ -71,9 +82,12 @@ def cli(url: str, output: str, region: str | None, log_level: str) -> None:
     _LOG.info("Export dokončen")
 
 
-def main(argv: list[str] | None = None) -> int:
+def main(
+    argv: list[str] | None = None,
+    client_factory: Callable[[], KarolAKvidoClient] = KarolAKvidoClient,
+) -> int:
     try:
-        cli.main(args=argv, prog_name="karolakvido", standalone_mode=False)
+        cli.main(args=argv, prog_name="karolakvido", standalone_mode=False, obj=client_factory)
     except click.exceptions.Exit as exc:
         return exc.exit_code
     except click.ClickException as exc:
@@ -1,49 +1,63 @@
 from __future__ import annotations
 
 import logging
+from datetime import UTC, datetime
 from pathlib import Path
 from uuid import NAMESPACE_URL, uuid5
 from zoneinfo import ZoneInfo
 
-from ics import Calendar
+from ics import Calendar, ContentLine
+from ics.contentline import Container
 from ics.event import Event as IcsEvent
 
 from . import TZ_NAME
 from .scraper import Event as ScrapedEvent
 
 _LOG = logging.getLogger(__name__)
+_TZ = ZoneInfo(TZ_NAME)
+_WRITE_BUFFER_SIZE = 64 * 1024
 
 
 def _build_description(event: ScrapedEvent) -> str:
     return event.detail_url
 
 
-def build_ics(events: list[ScrapedEvent]) -> str:
+def _build_container(events: list[ScrapedEvent]) -> Container:
     _LOG.info("Generuji ICS obsah pro %d událostí", len(events))
     calendar = Calendar(creator="-//karolakvido//calendar-export//CS")
+    dtstamp = datetime.now(UTC)
 
     for event in events:
-        starts_at = event.starts_at.replace(tzinfo=ZoneInfo(TZ_NAME))
+        starts_at = event.starts_at.replace(tzinfo=_TZ)
         ics_event = IcsEvent(
             uid=f"{uuid5(NAMESPACE_URL, event.detail_url)}@karolakvido",
             summary=event.title,
             begin=starts_at,
+            dtstamp=dtstamp,
             location=event.location or "Neuvedeno",
             description=_build_description(event),
         )
         calendar.events.append(ics_event)
 
-    serialized = calendar.serialize()
-    if f"X-WR-TIMEZONE:{TZ_NAME}" not in serialized:
-        serialized = serialized.replace(
-            "CALSCALE:GREGORIAN\r\n",
-            f"CALSCALE:GREGORIAN\r\nX-WR-TIMEZONE:{TZ_NAME}\r\n",
-        )
-    return serialized
+    container = calendar.to_container()
+    header_end = next(
+        (index for index, item in enumerate(container) if isinstance(item, Container)),
+        len(container),
+    )
+    container.insert(header_end, ContentLine("X-WR-TIMEZONE", value=TZ_NAME))
+    return container
+
+
+def build_ics(events: list[ScrapedEvent]) -> str:
+    return _build_container(events).serialize()
 
 
 def write_ics(events: list[ScrapedEvent], output_path: Path) -> None:
     _LOG.debug("Vytvářím adresář pro výstup: %s", output_path.parent)
     output_path.parent.mkdir(parents=True, exist_ok=True)
-    output_path.write_text(build_ics(events), encoding="utf-8")
+    container = _build_container(events)
+    with output_path.open(
+        "w", encoding="utf-8", newline="", buffering=_WRITE_BUFFER_SIZE
+    ) as output_file:
+        output_file.writelines(container.serialize_iter())
     _LOG.info("Soubor uložen: %s", output_path)
@@ -4,21 +4,25 @@ import logging
 import re
 import time
 import unicodedata
-from collections.abc import Callable
-from dataclasses import dataclass
+from bisect import insort
+from collections.abc import Callable, Iterator
 from datetime import UTC, datetime
 from email.utils import parsedate_to_datetime
+from functools import lru_cache
+from operator import attrgetter
+from typing import NamedTuple
 from urllib.parse import urljoin
 from zoneinfo import ZoneInfo
 
 import requests
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
 from bs4.element import NavigableString, Tag
 from tenacity import retry, retry_if_exception, stop_after_attempt, wait_exponential
 
 from . import TZ_NAME
 
 _LOG = logging.getLogger(__name__)
+_TZ = ZoneInfo(TZ_NAME)
 
 _MONTH_FROM_HEADING = {
     "leden": 1,
@@ -50,9 +54,30 @@ _MONTH_FROM_DAY_LABEL = {
     "pro": 12,
 }
 
+_HEADING_TAGS = frozenset({"h2", "h3", "h4", "h5"})
+_IGNORED_BLOCK_TAGS = frozenset({"script", "style"})
+_EVENT_LINK_STRAINER = SoupStrainer("a", href=True)
+
+_DROPPED_LABELS = frozenset({"vstupenky", "jiz brzy"})
+_DROPPED_LABEL_MAX_LENGTH = max(len(label) for label in _DROPPED_LABELS)
+
+_DIACRITICS_TABLE = str.maketrans(
+    "áäčďéěëíľĺňóôöřšťúůüýžÁÄČĎÉĚËÍĽĹŇÓÔÖŘŠŤÚŮÜÝŽ",
+    "aacdeeeillnooorstuuuyzAACDEEEILLNOOORSTUUUYZ",
+)
+
 _YEAR_AND_MONTH_RE = re.compile(r"(?P<month>[A-Za-zÁ-ž]+)\s+(?P<year>20\d{2})")
-_DAY_LABEL_RE = re.compile(r"(?P<month>[A-Za-zÁ-ž]+)?\s*(?P<day>\d{1,2})")
+_DAY_LABEL_PREFIXES = "|".join(key for key in _MONTH_FROM_DAY_LABEL if len(key) == 4)
+_DAY_LABEL_WORDS = "|".join(key for key in _MONTH_FROM_DAY_LABEL if len(key) < 4)
+_DAY_LABEL_RE = re.compile(
+    rf"(?:(?P<month>{_DAY_LABEL_PREFIXES}|(?:{_DAY_LABEL_WORDS})(?![a-z]))[a-z]*|[a-z]+)?"
+    r"\s*(?P<day>\d{1,2})",
+    re.ASCII,
+)
 _TIME_RE = re.compile(r"(?P<hour>\d{1,2}):(?P<minute>\d{2})")
+_TIME_TRAIL_RE = re.compile(r",\s*v(?:e)?\s*\d{1,2}:\d{2}.*$", re.IGNORECASE)
+_TIME_ONLY_RE = re.compile(r"v(?:e)?\s*\d{1,2}:\d{2}(?:\s*hodin?)?", re.IGNORECASE)
+_EVENT_URL_RE = re.compile(r"karolakvido\.cz.*(?:/akce_karol_a_kvido/|karol-a-kvido-slavi)")
 _LOCATION_RE = re.compile(r"^(?P<location>.+?),\s*v(?:e)?\s*\d{1,2}:\d{2}\b", re.IGNORECASE)
 
 
@@ -69,6 +94,18 @@ def _should_retry_http_error(exc: BaseException) -> bool:
     return False
 
 
+@lru_cache(maxsize=128)
+def _parse_http_date(value: str) -> datetime | None:
+    try:
+        parsed = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+
+    if parsed.tzinfo is None:
+        return parsed.replace(tzinfo=UTC)
+    return parsed
+
+
 def _parse_retry_after_seconds(header_value: str | None) -> float | None:
     if not header_value:
         return None
@@ -80,14 +117,10 @@ def _parse_retry_after_seconds(header_value: str | None) -> float | None:
     if value.isdigit():
         return float(value)
 
-    try:
-        retry_at = parsedate_to_datetime(value)
-    except (TypeError, ValueError):
+    retry_at = _parse_http_date(value)
+    if retry_at is None:
         return None
 
-    if retry_at.tzinfo is None:
-        retry_at = retry_at.replace(tzinfo=UTC)
-
     seconds = (retry_at - datetime.now(UTC)).total_seconds()
     if seconds <= 0:
         return 0.0
@@ -95,6 +128,10 @@ def _parse_retry_after_seconds(header_value: str | None) -> float | None:
 
 
 def _wait_before_retry(retry_state) -> float:
+    client = retry_state.args[0] if retry_state.args else None
+    if isinstance(client, KarolAKvidoClient) and client.retry_wait is not None:
+        return client.retry_wait
+
     default_wait = wait_exponential(multiplier=1, min=1, max=8)(retry_state)
     if retry_state.outcome is None or not retry_state.outcome.failed:
         return default_wait
@@ -112,8 +149,17 @@ def _wait_before_retry(retry_state) -> float:
     return max(default_wait, min(retry_after, 90.0))
 
 
-@dataclass(slots=True)
-class Event:
+def strip_diacritics(text: str) -> str:
+    if text.isascii():
+        return text
+    translated = text.translate(_DIACRITICS_TABLE)
+    if translated.isascii():
+        return translated
+    normalized = unicodedata.normalize("NFKD", translated)
+    return "".join(char for char in normalized if not unicodedata.combining(char))
+
+
+class Event(NamedTuple):
     title: str
     starts_at: datetime
     location: str
@@ -131,6 +177,7 @@ class KarolAKvidoClient:
         max_request_delay: float = 90.0,
         adaptive_backoff_factor: float = 2.0,
         sleep_fn: Callable[[float], None] = time.sleep,
+        retry_wait: float | None = None,
     ) -> None:
         self.connect_timeout = connect_timeout
         self.read_timeout = read_timeout
@@ -139,6 +186,7 @@ class KarolAKvidoClient:
         self.adaptive_backoff_factor = max(1.0, adaptive_backoff_factor)
         self._current_delay = self.request_delay
         self._sleep = sleep_fn
+        self.retry_wait = None if retry_wait is None else max(0.0, retry_wait)
         self._session = requests.Session()
         self._session.headers.update(
             {
@@ -187,7 +235,7 @@ class KarolAKvidoClient:
         return response.text
 
     def parse_events(self, html: str, base_url: str) -> list[Event]:
-        soup = BeautifulSoup(html, "html.parser")
+        soup = BeautifulSoup(html, "lxml")
 
         year: int | None = None
         month: int | None = None
@@ -195,54 +243,48 @@ class KarolAKvidoClient:
         day: int | None = None
 
         events: list[Event] = []
-        for tag in soup.find_all(["h2", "h3", "h4", "h5"]):
-            year, month, day = self._parse_heading_state(tag, year, month, day)
-
-            if tag.name == "h3":
-                current_city = self._normalize_whitespace(tag.get_text(" ", strip=True)) or None
-                continue
-
+        seen_urls: set[str] = set()
+        headings = (
+            node
+            for node in soup.descendants
+            if isinstance(node, Tag) and node.name in _HEADING_TAGS
+        )
+        for tag in headings:
             if tag.name != "h5":
+                text = self._normalize_whitespace(tag.get_text(" ", strip=True))
+                year, month, day = self._parse_heading_state(tag, text, year, month, day)
+                if tag.name == "h3":
+                    current_city = text or None
                 continue
 
-            for link in tag.find_all("a", href=True):
+            for link in tag.find_all(_EVENT_LINK_STRAINER):
+                full_url = self._resolve_event_url(link, base_url)
+                if full_url is None or full_url in seen_urls:
+                    continue
+
                 event = self._build_event_from_list_item(
                     link=link,
                     event_heading=tag,
-                    base_url=base_url,
+                    full_url=full_url,
                     year=year,
                     month=month,
                     day=day,
                     city=current_city,
                 )
-                if event is not None:
-                    events.append(event)
-
-        deduplicated_by_url: dict[str, Event] = {}
-        for event in events:
-            deduplicated_by_url[event.detail_url] = event
-        deduplicated_events = sorted(
-            deduplicated_by_url.values(), key=lambda event: event.starts_at
-        )
-        _LOG.info("Na stránce %s nalezeno %d událostí", base_url, len(deduplicated_events))
-        return deduplicated_events
+                if event is None:
+                    continue
+                seen_urls.add(full_url)
+                insort(events, event, key=attrgetter("starts_at"))
+
+        _LOG.info("Na stránce %s nalezeno %d událostí", base_url, len(events))
+        return events
 
     def collect_events(self, calendar_url: str) -> list[Event]:
         _LOG.info("Stahuji hlavní kalendář %s", calendar_url)
         calendar_html = self.fetch_text(calendar_url)
         return self.parse_events(calendar_html, calendar_url)
 
-    def _build_event_from_list_item(
-        self,
-        *,
-        link: Tag,
-        event_heading: Tag,
-        base_url: str,
-        year: int | None,
-        month: int | None,
-        day: int | None,
-        city: str | None,
-    ) -> Event | None:
+    def _resolve_event_url(self, link: Tag, base_url: str) -> str | None:
         href_value = link.get("href")
         if not isinstance(href_value, str):
             return None
@@ -252,11 +294,21 @@ class KarolAKvidoClient:
             return None
 
         full_url = urljoin(base_url, href)
-        if "karolakvido.cz" not in full_url:
-            return None
-        if "/akce_karol_a_kvido/" not in full_url and "karol-a-kvido-slavi" not in full_url:
+        if not _EVENT_URL_RE.search(full_url):
             return None
+        return full_url
 
+    def _build_event_from_list_item(
+        self,
+        *,
+        link: Tag,
+        event_heading: Tag,
+        full_url: str,
+        year: int | None,
+        month: int | None,
+        day: int | None,
+        city: str | None,
+    ) -> Event | None:
         title = self._normalize_whitespace(link.get_text(" ", strip=True))
         if not title:
             return None
@@ -269,7 +321,7 @@ class KarolAKvidoClient:
             _LOG.warning("Přeskakuji '%s' (%s): chybí datum v seznamu", title, full_url)
             return None
 
-        starts_at = datetime(year, month, day, hour, minute, tzinfo=ZoneInfo(TZ_NAME))
+        starts_at = datetime(year, month, day, hour, minute, tzinfo=_TZ)
         return Event(
             title=title,
             starts_at=starts_at,
@@ -280,10 +332,17 @@ class KarolAKvidoClient:
 
     def _collect_event_block_text(self, event_heading: Tag) -> str:
         chunks: list[str] = []
+        for text in self._iter_event_block_chunks(event_heading):
+            chunks.append(text)
+            if _TIME_RE.search(text):
+                break
+        return " ".join(chunks).strip()
+
+    def _iter_event_block_chunks(self, event_heading: Tag) -> Iterator[str]:
         for sibling in event_heading.next_siblings:
-            if isinstance(sibling, Tag) and sibling.name in {"h2", "h3", "h4", "h5"}:
+            if isinstance(sibling, Tag) and sibling.name in _HEADING_TAGS:
                 break
-            if isinstance(sibling, Tag) and sibling.name in {"script", "style"}:
+            if isinstance(sibling, Tag) and sibling.name in _IGNORED_BLOCK_TAGS:
                 continue
 
             if isinstance(sibling, Tag):
@@ -295,12 +354,11 @@ class KarolAKvidoClient:
 
             if not text:
                 continue
-            normalized = self._strip_diacritics(text).lower()
-            if normalized in {"vstupenky", "jiz brzy"}:
-                continue
-            chunks.append(text)
-
-        return " ".join(chunks).strip()
+            if len(text) <= _DROPPED_LABEL_MAX_LENGTH:
+                normalized = strip_diacritics(text).lower()
+                if normalized in _DROPPED_LABELS:
+                    continue
+            yield text
 
     def _extract_time(self, block_text: str) -> tuple[int, int]:
         match = _TIME_RE.search(block_text)
@@ -317,13 +375,8 @@ class KarolAKvidoClient:
                 if location:
                     return location
 
-            simplified = re.sub(
-                r",\s*v(?:e)?\s*\d{1,2}:\d{2}.*$", "", block_text, flags=re.IGNORECASE
-            )
-            simplified = simplified.strip(" ,")
-            if simplified and not re.fullmatch(
-                r"v(?:e)?\s*\d{1,2}:\d{2}(?:\s*hodin?)?", simplified, flags=re.IGNORECASE
-            ):
+            simplified = _TIME_TRAIL_RE.sub("", block_text).strip(" ,")
+            if simplified and not _TIME_ONLY_RE.fullmatch(simplified):
                 return simplified
 
         if city:
@@ -333,38 +386,37 @@ class KarolAKvidoClient:
     def _parse_heading_state(
         self,
         tag: Tag,
+        text: str,
         current_year: int | None,
         current_month: int | None,
         current_day: int | None,
     ) -> tuple[int | None, int | None, int | None]:
-        text = self._normalize_whitespace(tag.get_text(" ", strip=True))
         if not text:
             return current_year, current_month, current_day
 
         if tag.name == "h2":
             match = _YEAR_AND_MONTH_RE.search(text)
             if match:
-                month_token = self._strip_diacritics(match.group("month")).lower()
-                month_number = _MONTH_FROM_HEADING.get(month_token)
+                month_number = self._month_from_heading_token(match.group("month"))
                 if month_number is not None:
                     return int(match.group("year")), month_number, current_day
             return current_year, current_month, current_day
 
         if tag.name == "h4":
-            match = _DAY_LABEL_RE.search(text)
+            match = _DAY_LABEL_RE.search(strip_diacritics(text).lower())
             if match:
                 day_number = int(match.group("day"))
-                month_token = self._strip_diacritics(match.group("month") or "").lower()
-                month_from_day = _MONTH_FROM_DAY_LABEL.get(month_token[:4]) if month_token else None
+                month_token = match.group("month")
+                month_from_day = _MONTH_FROM_DAY_LABEL.get(month_token) if month_token else None
                 return current_year, (month_from_day or current_month), day_number
 
         return current_year, current_month, current_day
 
     @staticmethod
-    def _normalize_whitespace(text: str) -> str:
-        return " ".join(text.split())
+    @lru_cache(maxsize=256)
+    def _month_from_heading_token(token: str) -> int | None:
+        return _MONTH_FROM_HEADING.get(strip_diacritics(token).lower())
 
     @staticmethod
-    def _strip_diacritics(text: str) -> str:
-        normalized = unicodedata.normalize("NFKD", text)
-        return "".join(char for char in normalized if not unicodedata.combining(char))
+    def _normalize_whitespace(text: str) -> str:
+        return " ".join(text.split())
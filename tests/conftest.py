@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+
+from karolakvido import DEFAULT_OUTPUT_FILE
+from karolakvido.cli import main
+from karolakvido.scraper import Event, KarolAKvidoClient
+
+
+class StubClient(KarolAKvidoClient):
+    def __init__(self, events: list[Event]) -> None:
+        super().__init__(request_delay=0.0)
+        self.events = events
+        self.requested_urls: list[str] = []
+
+    def collect_events(self, url: str) -> list[Event]:
+        self.requested_urls.append(url)
+        return self.events
+
+
+@pytest.fixture(autouse=True)
+def _no_retry_sleep(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(KarolAKvidoClient.fetch_text.retry, "sleep", lambda _: None)
+
+
+@pytest.fixture(scope="session")
+def stub_client_factory() -> type[StubClient]:
+    return StubClient
+
+
+@pytest.fixture(scope="session")
+def client() -> KarolAKvidoClient:
+    return KarolAKvidoClient()
+
+
+@pytest.fixture(scope="session")
+def sample_events_template() -> tuple[Event, ...]:
+    return (
+        Event(
+            title="Pirátský poklad",
+            starts_at=datetime(2026, 2, 14, 10, 0),
+            location="Praha, Divadlo Lucie Bílé",
+            detail_url="https://karolakvido.cz/akce_karol_a_kvido/piratsky-poklad-14-unora-2026-praha/",
+            city="Praha",
+        ),
+        Event(
+            title="Dobrodružství začíná",
+            starts_at=datetime(2026, 2, 22, 16, 0),
+            location="Litvínov, Kino Máj",
+            detail_url="https://karolakvido.cz/akce_karol_a_kvido/dobrodruzstvi-zacina-22-unora-litvinov/",
+            city="Litvínov",
+        ),
+    )
+
+
+@pytest.fixture
+def sample_events(sample_events_template: tuple[Event, ...]) -> list[Event]:
+    return list(sample_events_template)
+
+
+@pytest.fixture(scope="session")
+def sample_ics_path(
+    tmp_path_factory: pytest.TempPathFactory,
+    sample_events_template: tuple[Event, ...],
+    stub_client_factory: type[StubClient],
+) -> Path:
+    tmp_path = tmp_path_factory.mktemp("ics")
+    stub = stub_client_factory(list(sample_events_template))
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.chdir(tmp_path)
+
+        assert main([], client_factory=lambda: stub) == 0
+
+    return tmp_path / DEFAULT_OUTPUT_FILE
+
+
+@pytest.fixture(scope="session")
+def sample_ics(sample_ics_path: Path) -> str:
+    return sample_ics_path.read_text(encoding="utf-8")
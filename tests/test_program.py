@@ -1,15 +1,39 @@
 from __future__ import annotations
 
-from datetime import datetime
+import re
+from collections.abc import Callable
 from pathlib import Path
 from typing import Any
 
 import pytest
 import requests
+from tenacity import RetryCallState
 
-from karolakvido import DEFAULT_CALENDAR_URL, DEFAULT_OUTPUT_FILE, TZ_NAME
+from karolakvido import DEFAULT_CALENDAR_URL, TZ_NAME
 from karolakvido.cli import main
-from karolakvido.scraper import Event, KarolAKvidoClient
+from karolakvido.ical import build_ics
+from karolakvido.scraper import (
+    Event,
+    KarolAKvidoClient,
+    _parse_retry_after_seconds,
+    _wait_before_retry,
+)
+
+CliRunner = Callable[..., tuple[int, list[str]]]
+
+_CALENDAR_HTML_ONCE = """
+<h2>ÚNOR 2026</h2>
+<h3>Praha</h3>
+<h4>Únor14</h4>
+<h5><a href="/akce_karol_a_kvido/ok/">A</a></h5>
+<p>Divadlo, v 10:00 hodin</p>
+"""
+
+_UNFOLD_RE = re.compile(r"\r?\n ")
+
+
+def _unfold(content: str) -> str:
+    return _UNFOLD_RE.sub("", content)
 
 
 def _build_response(
@@ -22,152 +46,120 @@ def _build_response(
     response = requests.Response()
     response.status_code = status_code
     response.url = url
-    response.request = requests.Request("GET", url).prepare()
     response._content = body.encode("utf-8")
     response.headers.update(headers or {})
     return response
 
 
-def _sample_events() -> list[Event]:
-    return [
-        Event(
-            title="Pirátský poklad",
-            starts_at=datetime(2026, 2, 14, 10, 0),
-            location="Praha, Divadlo Lucie Bílé",
-            detail_url="https://karolakvido.cz/akce_karol_a_kvido/piratsky-poklad-14-unora-2026-praha/",
-            city="Praha",
-        ),
-        Event(
-            title="Dobrodružství začíná",
-            starts_at=datetime(2026, 2, 22, 16, 0),
-            location="Litvínov, Kino Máj",
-            detail_url="https://karolakvido.cz/akce_karol_a_kvido/dobrodruzstvi-zacina-22-unora-litvinov/",
-            city="Litvínov",
-        ),
-    ]
+@pytest.fixture(scope="session")
+def sample_ics_unfolded(sample_ics: str) -> str:
+    return _unfold(sample_ics)
 
 
-def test_default_url_is_used(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
-    called = {}
+@pytest.fixture
+def captured_ics(monkeypatch: pytest.MonkeyPatch) -> dict[str, str]:
+    captured: dict[str, str] = {}
 
-    def fake_collect(self: KarolAKvidoClient, url: str) -> list[Event]:
-        called["url"] = url
-        return _sample_events()
+    def fake_write_ics(events: list[Event], output_path: Path) -> None:
+        captured["text"] = build_ics(events)
 
-    monkeypatch.setattr(KarolAKvidoClient, "collect_events", fake_collect)
-    monkeypatch.chdir(tmp_path)
-    monkeypatch.setattr("sys.argv", ["karolakvido"])
+    monkeypatch.setattr("karolakvido.cli.write_ics", fake_write_ics)
+    return captured
 
-    exit_code = main()
 
-    assert exit_code == 0
-    assert called["url"] == DEFAULT_CALENDAR_URL
-
-
-def test_custom_url_can_be_set(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
-    called = {}
-
-    def fake_collect(self: KarolAKvidoClient, url: str) -> list[Event]:
-        called["url"] = url
-        return _sample_events()
-
-    monkeypatch.setattr(KarolAKvidoClient, "collect_events", fake_collect)
+@pytest.fixture
+def cli_runner(
+    monkeypatch: pytest.MonkeyPatch,
+    tmp_path: Path,
+    sample_events: list[Event],
+    stub_client_factory: Callable[[list[Event]], Any],
+) -> CliRunner:
     monkeypatch.chdir(tmp_path)
-    monkeypatch.setattr("sys.argv", ["karolakvido", "--url", "https://example.com/kalendar"])
 
-    main()
+    def run(*args: str, events: list[Event] | None = None) -> tuple[int, list[str]]:
+        stub = stub_client_factory(sample_events if events is None else events)
+        exit_code = main(list(args), client_factory=lambda: stub)
+        return exit_code, stub.requested_urls
 
-    assert called["url"] == "https://example.com/kalendar"
+    return run
 
 
-def test_default_output_file_is_written(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
-    monkeypatch.setattr(KarolAKvidoClient, "collect_events", lambda self, url: _sample_events())
-    monkeypatch.chdir(tmp_path)
-    monkeypatch.setattr("sys.argv", ["karolakvido"])
+@pytest.mark.parametrize(
+    ("args", "expected_url"),
+    [
+        ((), DEFAULT_CALENDAR_URL),
+        (("--url", "https://example.com/kalendar"), "https://example.com/kalendar"),
+    ],
+    ids=["default", "custom"],
+)
+def test_calendar_url(cli_runner: CliRunner, args: tuple[str, ...], expected_url: str) -> None:
+    exit_code, requested_urls = cli_runner(*args)
+
+    assert exit_code == 0
+    assert requested_urls == [expected_url]
 
-    main()
 
-    assert (tmp_path / DEFAULT_OUTPUT_FILE).exists()
+def test_default_output_file_is_written(sample_ics_path: Path) -> None:
+    assert sample_ics_path.exists()
 
 
-def test_custom_output_path_is_written(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
-    monkeypatch.setattr(KarolAKvidoClient, "collect_events", lambda self, url: _sample_events())
+def test_custom_output_path_is_written(cli_runner: CliRunner, tmp_path: Path) -> None:
     output = tmp_path / "custom" / "events.ics"
     output.parent.mkdir(parents=True)
 
-    monkeypatch.chdir(tmp_path)
-    monkeypatch.setattr("sys.argv", ["karolakvido", "--output", str(output)])
-
-    main()
+    cli_runner("--output", str(output))
 
     assert output.exists()
 
 
-def test_filter_by_region(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
-    monkeypatch.setattr(KarolAKvidoClient, "collect_events", lambda self, url: _sample_events())
-    output = tmp_path / "praha.ics"
-
-    monkeypatch.chdir(tmp_path)
-    monkeypatch.setattr("sys.argv", ["karolakvido", "--region", "Praha", "--output", str(output)])
-
-    main()
-
-    content = output.read_text(encoding="utf-8")
-    unfolded = content.replace("\r\n ", "")
-    assert "Praha\\, Divadlo Lucie Bílé" in unfolded
-    assert "Litvínov\\, Kino Máj" not in unfolded
-
-
-def test_ics_uses_czech_timezone(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
-    monkeypatch.setattr(KarolAKvidoClient, "collect_events", lambda self, url: _sample_events())
-
-    output = tmp_path / "timezone.ics"
-    monkeypatch.chdir(tmp_path)
-    monkeypatch.setattr("sys.argv", ["karolakvido", "--output", str(output)])
-
-    main()
-
-    content = output.read_text(encoding="utf-8")
-    assert "BEGIN:VTIMEZONE" in content
-    assert TZ_NAME in content
-    assert "DTSTART;TZID=" in content
-    assert "20260214T100000" in content
-
+@pytest.mark.parametrize(
+    ("region", "kept", "dropped"),
+    [
+        ("Praha", "Praha\\, Divadlo Lucie Bílé", "Litvínov\\, Kino Máj"),
+        ("litvinov", "Litvínov\\, Kino Máj", "Praha\\, Divadlo Lucie Bílé"),
+    ],
+    ids=["exact", "without-diacritics"],
+)
+def test_filter_by_region(
+    cli_runner: CliRunner, captured_ics: dict[str, str], region: str, kept: str, dropped: str
+) -> None:
+    cli_runner("--region", region)
 
-def test_location_is_always_present(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
-    events = _sample_events()
-    events[0].location = ""
-    monkeypatch.setattr(KarolAKvidoClient, "collect_events", lambda self, url: events)
+    unfolded = _unfold(captured_ics["text"])
+    assert kept in unfolded
+    assert dropped not in unfolded
 
-    output = tmp_path / "location.ics"
-    monkeypatch.chdir(tmp_path)
-    monkeypatch.setattr("sys.argv", ["karolakvido", "--output", str(output)])
 
-    main()
+def test_ics_uses_czech_timezone(sample_ics: str) -> None:
+    assert "BEGIN:VTIMEZONE" in sample_ics
+    timezone_header = sample_ics.index(f"\nX-WR-TIMEZONE:{TZ_NAME}\n")
+    assert timezone_header < sample_ics.index("BEGIN:VTIMEZONE")
+    assert timezone_header < sample_ics.index("BEGIN:VEVENT")
+    assert "DTSTART;TZID=" in sample_ics
+    assert "20260214T100000" in sample_ics
 
-    content = output.read_text(encoding="utf-8")
-    assert "LOCATION:Neuvedeno" in content
 
-
-def test_description_contains_only_link(
-    monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+def test_location_is_always_present(
+    cli_runner: CliRunner,
+    captured_ics: dict[str, str],
+    sample_events: list[Event],
 ) -> None:
-    monkeypatch.setattr(KarolAKvidoClient, "collect_events", lambda self, url: _sample_events())
+    sample_events[0] = sample_events[0]._replace(location="")
 
-    output = tmp_path / "description.ics"
-    monkeypatch.chdir(tmp_path)
-    monkeypatch.setattr("sys.argv", ["karolakvido", "--output", str(output)])
+    cli_runner(events=sample_events)
 
-    main()
+    assert "LOCATION:Neuvedeno" in captured_ics["text"]
 
-    content = output.read_text(encoding="utf-8")
-    unfolded = content.replace("\r\n ", "").replace("\n ", "")
-    assert "DESCRIPTION:https://karolakvido.cz/akce_karol_a_kvido/piratsky-poklad" in unfolded
-    assert "Připravte se na show plnou dobrodružství" not in unfolded
 
+def test_description_contains_only_link(sample_ics_unfolded: str) -> None:
+    assert (
+        "DESCRIPTION:https://karolakvido.cz/akce_karol_a_kvido/piratsky-poklad"
+        in sample_ics_unfolded
+    )
+    assert "Připravte se na show plnou dobrodružství" not in sample_ics_unfolded
 
-def test_parser_extracts_events_from_fixture() -> None:
-    client = KarolAKvidoClient()
+
+def test_parser_extracts_events_from_fixture(client: KarolAKvidoClient) -> None:
     calendar_html = """
         <html>
             <body>
@@ -207,8 +199,7 @@ def test_parser_extracts_events_from_fixture() -> None:
     assert first.location == "Divadlo Lucie Bílé"
 
 
-def test_parser_handles_sparse_markup_without_location() -> None:
-    client = KarolAKvidoClient()
+def test_parser_handles_sparse_markup_without_location(client: KarolAKvidoClient) -> None:
     calendar_html = """
     <h2>KVĚTEN 2026</h2>
     <h3>Praha</h3>
@@ -229,21 +220,119 @@ def test_parser_handles_sparse_markup_without_location() -> None:
     assert events[0].starts_at.minute == 0
 
 
-def test_collect_events_fetches_calendar_once(monkeypatch: pytest.MonkeyPatch) -> None:
-    client = KarolAKvidoClient()
-    calendar_url = "https://karolakvido.cz/kalendar-koncertu/"
-    calls: list[str] = []
+@pytest.mark.parametrize(
+    ("label", "expected_month", "expected_day"),
+    [
+        ("Led5", 1, 5),
+        ("Leden5", 3, 5),
+        ("Únor14", 2, 14),
+        ("Květen 7", 5, 7),
+        ("Čvc5", 7, 5),
+        ("So 5", 3, 5),
+        ("21", 3, 21),
+    ],
+)
+def test_parser_reads_month_from_day_label(
+    client: KarolAKvidoClient, label: str, expected_month: int, expected_day: int
+) -> None:
+    calendar_html = f"""
+    <h2>BŘEZEN 2026</h2>
+    <h3>Praha</h3>
+    <h4>{label}</h4>
+    <h5><a href="/akce_karol_a_kvido/a/">A</a></h5>
+    <p>v 10:00 hodin</p>
+    """
+
+    events = client.parse_events(calendar_html, "https://karolakvido.cz/kalendar-koncertu/")
+
+    assert [(event.starts_at.month, event.starts_at.day) for event in events] == [
+        (expected_month, expected_day)
+    ]
+
+
+def test_parser_stops_event_block_at_time(client: KarolAKvidoClient) -> None:
+    calendar_html = """
+    <h2>KVĚTEN 2026</h2>
+    <h3>Praha</h3>
+    <h4>Květ16</h4>
+    <h5><a href="/akce_karol_a_kvido/koncert/">Koncert</a></h5>
+    <p>Vstupenky</p>
+    <p>v 18:00 hodin</p>
+    <p>Přijďte si s námi zazpívat a zatancovat.</p>
+    """
+
+    events = client.parse_events(calendar_html, "https://karolakvido.cz/kalendar-koncertu/")
+
+    assert len(events) == 1
+    assert events[0].location == "Praha"
+    assert events[0].starts_at.hour == 18
+
+
+def test_parser_ignores_links_outside_event_pages(client: KarolAKvidoClient) -> None:
+    calendar_html = """
+    <h2>ÚNOR 2026</h2>
+    <h3>Praha</h3>
+    <h4>Únor14</h4>
+    <h5>
+        <a href="/kontakt/">Kontakt</a>
+        <a href="https://example.com/akce_karol_a_kvido/cizi/">Cizí akce</a>
+        <a href="/karol-a-kvido-slavi-10-let/">Karol a Kvído slaví</a>
+    </h5>
+    <p>Divadlo, v 10:00 hodin</p>
+    """
+
+    events = client.parse_events(calendar_html, "https://karolakvido.cz/kalendar-koncertu/")
+
+    assert [event.title for event in events] == ["Karol a Kvído slaví"]
+
+
+def test_parser_keeps_first_occurrence_of_duplicate_event(client: KarolAKvidoClient) -> None:
     calendar_html = """
     <h2>ÚNOR 2026</h2>
     <h3>Praha</h3>
     <h4>Únor14</h4>
-    <h5><a href=\"/akce_karol_a_kvido/ok/\">A</a></h5>
+    <h5><a href="/akce_karol_a_kvido/dup/">A</a></h5>
+    <p>Divadlo, v 10:00 hodin</p>
+    <h4>Únor15</h4>
+    <h5><a href="/akce_karol_a_kvido/dup/">A</a></h5>
     <p>Divadlo, v 10:00 hodin</p>
     """
 
+    events = client.parse_events(calendar_html, "https://karolakvido.cz/kalendar-koncertu/")
+
+    assert len(events) == 1
+    assert events[0].starts_at.day == 14
+
+
+def test_parser_returns_events_in_chronological_order(client: KarolAKvidoClient) -> None:
+    calendar_html = """
+    <h2>BŘEZEN 2026</h2>
+    <h3>Brno</h3>
+    <h4>Břez1</h4>
+    <h5><a href="/akce_karol_a_kvido/brezen/">B</a></h5>
+    <p>Sál, v 10:00 hodin</p>
+    <h2>ÚNOR 2026</h2>
+    <h3>Praha</h3>
+    <h4>Únor14</h4>
+    <h5><a href="/akce_karol_a_kvido/unor-vecer/">C</a></h5>
+    <p>Divadlo, v 18:00 hodin</p>
+    <h5><a href="/akce_karol_a_kvido/unor-rano/">A</a></h5>
+    <p>Divadlo, v 10:00 hodin</p>
+    """
+
+    events = client.parse_events(calendar_html, "https://karolakvido.cz/kalendar-koncertu/")
+
+    assert [event.title for event in events] == ["A", "C", "B"]
+
+
+def test_collect_events_fetches_calendar_once(monkeypatch: pytest.MonkeyPatch) -> None:
+    client = KarolAKvidoClient()
+    calendar_url = "https://karolakvido.cz/kalendar-koncertu/"
+    calls: list[str] = []
+
     def fake_fetch(self: KarolAKvidoClient, url: str) -> str:
         calls.append(url)
-        return calendar_html
+        return _CALENDAR_HTML_ONCE
 
     monkeypatch.setattr(KarolAKvidoClient, "fetch_text", fake_fetch)
 
@@ -254,8 +343,7 @@ def test_collect_events_fetches_calendar_once(monkeypatch: pytest.MonkeyPatch) -
 
 
 def test_fetch_text_retries_on_http_429(monkeypatch: pytest.MonkeyPatch) -> None:
-    client = KarolAKvidoClient()
-    client._sleep = lambda _: None
+    client = KarolAKvidoClient(sleep_fn=lambda _: None, retry_wait=0)
     url = "https://example.com/kalendar"
     responses = [
         _build_response(status_code=429, url=url, headers={"Retry-After": "0"}),
@@ -268,7 +356,6 @@ def test_fetch_text_retries_on_http_429(monkeypatch: pytest.MonkeyPatch) -> None
         return responses.pop(0)
 
     monkeypatch.setattr(client._session, "get", fake_get)
-    monkeypatch.setattr(KarolAKvidoClient.fetch_text.retry, "sleep", lambda _: None)
 
     body = client.fetch_text(url)
 
@@ -277,8 +364,7 @@ def test_fetch_text_retries_on_http_429(monkeypatch: pytest.MonkeyPatch) -> None
 
 
 def test_fetch_text_does_not_retry_on_http_404(monkeypatch: pytest.MonkeyPatch) -> None:
-    client = KarolAKvidoClient()
-    client._sleep = lambda _: None
+    client = KarolAKvidoClient(sleep_fn=lambda _: None, retry_wait=0)
     url = "https://example.com/missing"
     response_404 = _build_response(status_code=404, url=url)
     calls: list[tuple[str, Any]] = []
@@ -288,9 +374,31 @@ def test_fetch_text_does_not_retry_on_http_404(monkeypatch: pytest.MonkeyPatch)
         return response_404
 
     monkeypatch.setattr(client._session, "get", fake_get)
-    monkeypatch.setattr(KarolAKvidoClient.fetch_text.retry, "sleep", lambda _: None)
 
     with pytest.raises(requests.HTTPError):
         client.fetch_text(url)
 
     assert len(calls) == 1
+
+
+def test_retry_after_accepts_seconds_and_http_dates() -> None:
+    assert _parse_retry_after_seconds("12") == 12.0
+    assert _parse_retry_after_seconds("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+    assert _parse_retry_after_seconds("nonsense") is None
+    assert _parse_retry_after_seconds(None) is None
+
+
+@pytest.mark.parametrize(
+    ("retry_wait", "expected_wait"), [(None, 30.0), (0.5, 0.5)], ids=["retry-after", "fixed"]
+)
+def test_wait_before_retry_honors_fixed_retry_wait(
+    retry_wait: float | None, expected_wait: float
+) -> None:
+    client = KarolAKvidoClient(retry_wait=retry_wait)
+    url = "https://karolakvido.cz/kalendar-koncertu/"
+    response = _build_response(status_code=429, url=url, headers={"Retry-After": "30"})
+    retry_state = RetryCallState(KarolAKvidoClient.fetch_text.retry, None, (client, url), {})
+    error = requests.HTTPError(response=response)
+    retry_state.set_exception((requests.HTTPError, error, None))
+
+    assert _wait_before_retry(retry_state) == expected_wait
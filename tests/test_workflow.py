@@ -1,12 +1,18 @@
 from __future__ import annotations
 
+import re
 from pathlib import Path
 
+_WORKFLOW_RE = re.compile(
+    r'cron: "0 6 \* \* 1"'
+    r".*uv run karolakvido --output public/karolakvido\.ics"
+    r".*uv run karolakvido --region Praha --output public/karolakvido-praha\.ics"
+    r".*actions/deploy-pages@v4",
+    re.S,
+)
+
 
 def test_workflow_contains_weekly_and_two_exports() -> None:
     workflow = Path(".github/workflows/publish-ics.yml").read_text(encoding="utf-8")
 
-    assert 'cron: "0 6 * * 1"' in workflow
-    assert "uv run karolakvido --output public/karolakvido.ics" in workflow
-    assert "uv run karolakvido --region Praha --output public/karolakvido-praha.ics" in workflow
-    assert "actions/deploy-pages@v4" in workflow
+    assert _WORKFLOW_RE.search(workflow)